@@ -1,28 +1,65 @@
 import csv
 import os
+from collections import defaultdict
+from pathlib import Path
 
-def load_questionnaire(filepath="vendor_questionnaire_template.csv"):
-    """Loads the questionnaire template from a CSV file."""
-    questions = []
+import numpy as np
+import pandas as pd
+
+_INT64 = np.iinfo(np.int64)
+
+def _to_whole_numbers(values):
+    """Parses strings the way int() does into an Int64 Series; anything else, or outside int64, becomes NA."""
+    values = values.astype('string').str.strip()
+    is_whole_number = values.str.fullmatch(r'[+-]?\d+').fillna(False).astype(bool)
+    parsed = (int(v) if ok else None for v, ok in zip(values, is_whole_number))
+    return pd.Series([n if n is not None and _INT64.min <= n <= _INT64.max else None for n in parsed],
+                     index=values.index, dtype='Int64')
+
+def prepared_template_path(filepath):
+    """Returns where prepare_template.py stores the pickled copy of a template CSV."""
+    return os.path.splitext(filepath)[0] + '.pkl'
+
+def load_questionnaire(filepath="vendor_questionnaire_template.csv", use_prepared=True):
+    """Loads the questionnaire template into a DataFrame, from the prepared pickle if it is up to date."""
+    prepared_path = prepared_template_path(filepath)
     try:
-        with open(filepath, mode='r', encoding='utf-8') as infile:
-            # Use DictReader for easy access by column name
-            reader = csv.DictReader(infile)
-            # Ensure required columns exist
-            required_cols = ['QuestionID', 'QuestionText', 'AnswerType', 'RiskWeight', 'RiskArea']
-            
-            
-            if not all(col in reader.fieldnames for col in required_cols):
-                 raise ValueError(f"CSV is missing required columns. Make sure it has: {required_cols}")
-
-            for row in reader:
-                # Basic type conversion for RiskWeight
-                try:
-                    row['RiskWeight'] = int(row['RiskWeight'])
-                except ValueError:
-                    print(f"Warning: Invalid RiskWeight for QuestionID {row.get('QuestionID', 'N/A')}. Using 0.")
-                    row['RiskWeight'] = 0 # Default to 0 if not a valid number
-                questions.append(row)
+        # The pickle written by prepare_template.py skips CSV parsing, as long as the CSV hasn't changed since
+        if use_prepared and os.path.exists(prepared_path) and (
+                not os.path.exists(filepath) or os.path.getmtime(prepared_path) >= os.path.getmtime(filepath)):
+            questions = pd.read_pickle(prepared_path)
+            print(f"Successfully loaded {len(questions)} questions from {prepared_path}")
+            return questions
+
+        # Read straight into typed columns; keep_default_na=False leaves empty cells as ''
+        questions = pd.read_csv(filepath, encoding='utf-8', keep_default_na=False, dtype={
+            'QuestionID': 'string',
+            'QuestionText': 'string',
+            'AnswerType': 'category',
+            'RiskWeight': 'string',
+            'RiskArea': 'category',
+        })
+        # Ensure required columns exist
+        required_cols = ['QuestionID', 'QuestionText', 'AnswerType', 'RiskWeight', 'RiskArea']
+        if not all(col in questions.columns for col in required_cols):
+             raise ValueError(f"CSV is missing required columns. Make sure it has: {required_cols}")
+        # Answers and template details are matched up by QuestionID, so it must be unique
+        duplicate_ids = questions.loc[questions['QuestionID'].duplicated(), 'QuestionID'].unique().tolist()
+        if duplicate_ids:
+             raise ValueError(f"CSV has duplicate QuestionIDs: {duplicate_ids}")
+
+        # Basic type conversion for RiskWeight
+        # Only whole numbers are valid (matching int()), so '3.5' or '1e3' fall back to 0 instead of being truncated
+        risk_weights = _to_whole_numbers(questions['RiskWeight'])
+        for question_id in questions.loc[risk_weights.isna(), 'QuestionID']:
+            print(f"Warning: Invalid RiskWeight for QuestionID {question_id}. Using 0.")
+        questions['RiskWeight'] = risk_weights.fillna(0).astype('int64') # Default to 0 if not a valid number
+        # Normalize AnswerType once here so the rest of the script can compare it directly
+        questions['AnswerType'] = questions['AnswerType'].str.lower().astype('category')
+        # Split multiple controls (separated by semicolon) into a list once here
+        controls = questions['RelevantFrameworkControl'] if 'RelevantFrameworkControl' in questions.columns else pd.Series('', index=questions.index)
+        questions['RelevantFrameworkControl'] = controls.map(lambda s: [c.strip() for c in s.split(';') if c.strip()])
+
         print(f"Successfully loaded {len(questions)} questions from {filepath}")
         return questions
     except FileNotFoundError:
@@ -32,41 +69,56 @@ def load_questionnaire(filepath="vendor_questionnaire_template.csv"):
         print(f"An error occurred loading the questionnaire: {e}")
         return None
     
+_YN_OK = frozenset({'yes', 'no', 'y', 'n'})
+_YN_YES = frozenset({'yes', 'y'})
+
+# Input validators, one per AnswerType. Each takes the stripped, lower-cased input and
+# returns (answer, None) when it is valid or (None, error_message) when it is not.
+def _validate_yes_no(user_input):
+    if user_input in _YN_OK:
+        # Standardize answer for consistency
+        return ('yes' if user_input in _YN_YES else 'no'), None
+    return None, "Invalid input. Please enter 'yes' or 'no'."
+
+def _validate_score_1_5(user_input):
+    try:
+        score = int(user_input)
+    except ValueError:
+        return None, "Invalid input. Please enter a number."
+    if 1 <= score <= 5:
+        return str(score), None # Return as string to keep data consistent
+    return None, "Invalid input. Please enter a number between 1 and 5."
+
+def _validate_text(user_input):
+    if user_input: # Allow any non-empty string
+        return user_input, None
+    return None, "Input cannot be empty for text questions."
+
+VALIDATORS = {
+    'yes_no': _validate_yes_no,
+    'score_1_5': _validate_score_1_5,
+    'text': _validate_text,
+}
+
 def get_validated_input(question):
     """Gets validated input from the user based on the question's AnswerType."""
     prompt = f"\n{question['QuestionID']}: {question['QuestionText']} ({question['AnswerType']})\nYour answer: "
+    validator = VALIDATORS.get(question['AnswerType']) # AnswerType is already lower-cased by load_questionnaire
+    if validator is None:
+        # Should not happen if template is correct, but good fallback
+        user_input = input(prompt).strip().lower()
+        print(f"Warning: Unknown AnswerType '{question['AnswerType']}'. Accepting any text.")
+        return user_input
+
     while True:
-        user_input = input(prompt).strip().lower() # Get input, strip whitespace, lowercase
-        answer_type = question['AnswerType'].lower()
-
-        if answer_type == 'yes_no':
-            if user_input in ['yes', 'no', 'y', 'n']:
-                # Standardize answer for consistency
-                return 'yes' if user_input in ['yes', 'y'] else 'no'
-            else:
-                print("Invalid input. Please enter 'yes' or 'no'.")
-        elif answer_type == 'score_1_5':
-            try:
-                score = int(user_input)
-                if 1 <= score <= 5:
-                    return str(score) # Return as string to keep data consistent
-                else:
-                    print("Invalid input. Please enter a number between 1 and 5.")
-            except ValueError:
-                print("Invalid input. Please enter a number.")
-        elif answer_type == 'text':
-            if user_input: # Allow any non-empty string
-                 return user_input # Return original case for text
-            else:
-                print("Input cannot be empty for text questions.")
-        else:
-            # Should not happen if template is correct, but good fallback
-            print(f"Warning: Unknown AnswerType '{question['AnswerType']}'. Accepting any text.")
-            return user_input
-
-def conduct_assessment(questions):
+        answer, error = validator(input(prompt).strip().lower()) # Get input, strip whitespace, lowercase
+        if error is None:
+            return answer
+        print(error)
+
+def conduct_assessment(question_lookup):
     """Guides the user through the questionnaire and collects answers."""
-    if not questions:
+    if not question_lookup:
         print("No questions loaded to conduct assessment.")
         return None
 
@@ -78,116 +130,134 @@ def conduct_assessment(questions):
     print(f"\n--- Starting Assessment for {vendor_name} ---")
 
     assessment_results = []
-    for question in questions:
+    for question in question_lookup.values():
         answer = get_validated_input(question)
-        assessment_results.append({
-            'QuestionID': question['QuestionID'],
-            'QuestionText': question['QuestionText'],
-            'AnswerType': question['AnswerType'],
-            'RiskWeight': question['RiskWeight'], # Keep the weight for scoring
-            'RiskArea': question['RiskArea'],
-            'AnswerGiven': answer,
-            # RelevantFrameworkControl will be added in Phase 2 processing
-        })
+        # Only keep the answer; question details are looked up from the template when needed
+        assessment_results.append({'QuestionID': question['QuestionID'], 'AnswerGiven': answer})
 
     print(f"\n--- Assessment for {vendor_name} Completed ---")
     return vendor_name, assessment_results
 
-def calculate_risk_score(assessment_results):
+def calculate_risk_score(questions, assessment_results):
     """Calculates a simple total risk score based on answers and weights."""
-    total_risk_points = 0
-    question_scores = {} # To store points per question
+    if not assessment_results:
+        return 0, {}
 
-    for result in assessment_results:
-        question_id = result['QuestionID']
-        answer = result['AnswerGiven']
-        answer_type = result['AnswerType'].lower()
-        risk_weight = result['RiskWeight']
-        points = 0 # Points contributed by this answer
-
-        if answer_type == 'yes_no':
-            # 'no' answers add risk points based on weight
-            if answer == 'no':
-                points = risk_weight
-            # 'yes' answers add 0 points
-
-        elif answer_type == 'score_1_5':
-             try:
-                 score = int(answer)
-                 # Lower scores (1, 2) add more risk points based on weight
-                 # Score 1 adds (5-1)*weight = 4*weight
-                 # Score 5 adds (5-5)*weight = 0*weight
-                 points = (5 - score) * risk_weight
-             except ValueError:
-                 # Should not happen with validation, but handle defensively
-                 print(f"Warning: Could not score QuestionID {question_id} with invalid answer '{answer}'.")
-                 points = risk_weight # Assume highest risk if un-scorable
-
-        # Text answers don't contribute directly to this simple numeric score
-        # You could add logic here to flag text answers for review if needed
-
-        total_risk_points += points
-        question_scores[question_id] = points # Store points for this question
+    # Join answers to the template columns so scoring runs as vector ops instead of a per-row loop
+    scored = pd.DataFrame(assessment_results, columns=['QuestionID', 'AnswerGiven']).merge(
+        questions[['QuestionID', 'AnswerType', 'RiskWeight']], on='QuestionID')
+    answer_types = scored['AnswerType']
+
+    ids = scored['QuestionID'].to_numpy(dtype=object)
+    weights = scored['RiskWeight'].to_numpy(dtype=np.int64)
+    answers = scored['AnswerGiven'].to_numpy(dtype=object)
+    points = np.zeros(len(scored), dtype=np.int64)
+
+    # Only yes_no and score_1_5 answers can add points, so every other row is skipped before its answer is inspected
+    yn_rows = np.flatnonzero(answer_types.eq('yes_no').to_numpy())
+    sc_rows = np.flatnonzero(answer_types.eq('score_1_5').to_numpy())
+
+    # 'no' answers add risk points based on weight, 'yes' answers add 0 points
+    no_rows = yn_rows[answers[yn_rows] == 'no']
+    points[no_rows] = weights[no_rows]
+
+    # Lower scores (1, 2) add more risk points based on weight
+    # Score 1 adds (5-1)*weight = 4*weight
+    # Score 5 adds (5-5)*weight = 0*weight
+    # Parse the scores the way int() would; anything else (e.g. '3.0', '1e0') comes back invalid instead of raising
+    scores = _to_whole_numbers(scored['AnswerGiven'].iloc[sc_rows])
+    is_valid = scores.notna().to_numpy()
+    valid_rows = sc_rows[is_valid]
+    points[valid_rows] = (5 - scores[is_valid].to_numpy(dtype=np.int64)) * weights[valid_rows]
+
+    # Should not happen with validation, but handle defensively
+    invalid_rows = sc_rows[~is_valid]
+    for question_id, answer in zip(ids[invalid_rows], answers[invalid_rows]):
+        print(f"Warning: Could not score QuestionID {question_id} with invalid answer '{answer}'.")
+    points[invalid_rows] = weights[invalid_rows] # Assume highest risk if un-scorable
+
+    # Text answers don't contribute directly to this simple numeric score
+    # You could add logic here to flag text answers for review if needed
+
+    total_risk_points = int(points.sum())
+    question_scores = dict(zip(ids.tolist(), points.tolist())) # Points per question as plain ints
 
     return total_risk_points, question_scores
 
-def generate_assessment_report(vendor_name, assessment_results, total_score, question_scores):
+def generate_assessment_report(vendor_name, question_lookup, assessment_results, total_score, question_scores):
     """Generates a human-readable assessment report in Markdown format."""
     report_filename = f"assessment_report_{vendor_name.replace(' ', '_').lower()}.md"
 
-    with open(report_filename, mode='w', encoding='utf-8') as outfile:
-        outfile.write(f"# Vendor Risk Assessment Report: {vendor_name}\n\n")
-        outfile.write(f"**Date of Assessment:** {os.path.basename(__file__)} (Simulated)\n") # Indicates it's from your script
-        outfile.write(f"**Total Risk Score (Higher is riskier):** {total_score}\n\n") # Explain what score means
+    # Collect the report in memory and write it in one go
+    parts = [
+        f"# Vendor Risk Assessment Report: {vendor_name}\n\n",
+        f"**Date of Assessment:** {os.path.basename(__file__)} (Simulated)\n", # Indicates it's from your script
+        f"**Total Risk Score (Higher is riskier):** {total_score}\n\n", # Explain what score means
+    ]
 
-        # Basic scoring interpretation (optional)
-        if total_score > 50: # Example thresholds, adjust based on your RiskWeights
-            risk_level = "High"
-        elif total_score > 20:
-            risk_level = "Medium"
-        else:
-             risk_level = "Low"
-        outfile.write(f"**Overall Risk Level (Based on simple scoring):** {risk_level}\n\n")
+    # Basic scoring interpretation (optional)
+    if total_score > 50: # Example thresholds, adjust based on your RiskWeights
+        risk_level = "High"
+    elif total_score > 20:
+        risk_level = "Medium"
+    else:
+         risk_level = "Low"
+    parts.append(f"**Overall Risk Level (Based on simple scoring):** {risk_level}\n\n")
 
 
-        outfile.write("## Detailed Responses\n\n")
+    parts.append("## Detailed Responses\n\n")
 
-        # Sort results by RiskArea for better readability
-        sorted_results = sorted(assessment_results, key=lambda x: x.get('RiskArea', ''))
+    # Group results by RiskArea for better readability (answers keep their original order within an area)
+    results_by_area = defaultdict(list)
+    for result in assessment_results:
+        question = question_lookup[result['QuestionID']]
+        results_by_area[question.get('RiskArea', 'Uncategorized')].append((question, result))
 
-        current_risk_area = None
-        for result in sorted_results:
-            if result.get('RiskArea') != current_risk_area:
-                current_risk_area = result.get('RiskArea', 'Uncategorized')
-                outfile.write(f"### {current_risk_area}\n\n")
+    for risk_area in sorted(results_by_area):
+        parts.append(f"### {risk_area}\n\n")
 
-            question_id = result['QuestionID']
+        for question, result in results_by_area[risk_area]:
+            question_id = question['QuestionID']
             points_earned = question_scores.get(question_id, 0)
 
-            outfile.write(f"**{question_id}:** {result['QuestionText']}\n")
-            outfile.write(f"> **Answer:** {result['AnswerGiven']}\n")
             # Only show points if they contributed
-            if result['AnswerType'].lower() != 'text':
-                 outfile.write(f"> **Risk Points Added:** {points_earned} (Weight: {result['RiskWeight']})\n")
-            outfile.write("\n") # Add a blank line between questions
+            points_line = ""
+            if question['AnswerType'] != 'text':
+                 points_line = f"> **Risk Points Added:** {points_earned} (Weight: {question['RiskWeight']})\n"
+            parts.append(
+                f"**{question_id}:** {question['QuestionText']}\n"
+                f"> **Answer:** {result['AnswerGiven']}\n"
+                f"{points_line}"
+                "\n" # Add a blank line between questions
+            )
+
+    parts.append("\n---\n")
+    parts.append("This is a simulated assessment generated by a GRC Automation Toolkit project. The scoring is based on a simplified model.")
 
-        outfile.write("\n---\n")
-        outfile.write("This is a simulated assessment generated by a GRC Automation Toolkit project. The scoring is based on a simplified model.")
+    Path(report_filename).write_text(''.join(parts), encoding='utf-8')
 
     print(f"Assessment report saved to {report_filename}")
     return report_filename
 
-def save_assessment_data(vendor_name, assessment_results):
-    """Saves the raw assessment results to a CSV file for further processing."""
+def save_assessment_data(vendor_name, question_lookup, assessment_results, question_scores):
+    """Saves the assessment results joined with their template details to a CSV file for further processing."""
     data_filename = f"completed_assessment_{vendor_name.replace(' ', '_').lower()}.csv"
-    # Ensure the data includes RiskWeight and AnswerType for Phase 2 logic
-    fieldnames = ['QuestionID', 'QuestionText', 'AnswerType', 'RiskWeight', 'RiskArea', 'AnswerGiven'] # Add more fields if needed
+    # Include the template details Phase 2 needs so it only has to read this one file
+    # RiskPoints is saved so Phase 2 doesn't have to re-score every answer
+    fieldnames = ['QuestionID', 'QuestionText', 'AnswerType', 'RiskWeight', 'RiskArea', 'RelevantFrameworkControl', 'AnswerGiven', 'RiskPoints']
 
     try:
         with open(data_filename, mode='w', newline='', encoding='utf-8') as outfile:
-            writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(assessment_results)
+            # Columns are fixed, so plain tuples in fieldnames order avoid DictWriter's per-field lookups
+            writer = csv.writer(outfile)
+            writer.writerow(fieldnames)
+            for result in assessment_results:
+                question_id = result['QuestionID']
+                question = question_lookup[question_id]
+                writer.writerow((
+                    question_id, question['QuestionText'], question['AnswerType'], question['RiskWeight'], question['RiskArea'],
+                    '; '.join(question['RelevantFrameworkControl']), result['AnswerGiven'], question_scores.get(question_id, 0),
+                ))
         print(f"Raw assessment data saved to {data_filename}")
         return data_filename
     except Exception as e:
@@ -202,12 +272,14 @@ if __name__ == "__main__":
     #     # Optionally exit: sys.exit(1)
 
     questionnaire = load_questionnaire()
-    if questionnaire:
-        vendor_name, results = conduct_assessment(questionnaire)
+    if questionnaire is not None and not questionnaire.empty:
+        # Build the {QuestionID: question} lookup once and share it with every step that needs question details
+        question_lookup = {q['QuestionID']: q for q in questionnaire.to_dict('records')}
+        vendor_name, results = conduct_assessment(question_lookup)
         if results:
-            total_score, question_scores = calculate_risk_score(results)
-            report_file = generate_assessment_report(vendor_name, results, total_score, question_scores)
-            data_file = save_assessment_data(vendor_name, results)
+            total_score, question_scores = calculate_risk_score(questionnaire, results)
+            report_file = generate_assessment_report(vendor_name, question_lookup, results, total_score, question_scores)
+            data_file = save_assessment_data(vendor_name, question_lookup, results, question_scores)
             print("\nPhase 1 completed.")
             if report_file: print(f"- Report: {report_file}")
             if data_file: print(f"- Data: {data_file}")
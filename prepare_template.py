@@ -0,0 +1,25 @@
+from phase1_assessor import load_questionnaire, prepared_template_path
+
+def prepare_template(filepath="vendor_questionnaire_template.csv"):
+    """Parses the questionnaire template CSV once and saves it as a pickle for Phase 1 to load."""
+    questions = load_questionnaire(filepath, use_prepared=False) # RelevantFrameworkControl comes back pre-split
+    if questions is None:
+        return None
+
+    prepared_path = prepared_template_path(filepath)
+    try:
+        questions.to_pickle(prepared_path, protocol=5)
+        print(f"Prepared template saved to {prepared_path}")
+        return prepared_path
+    except Exception as e:
+        print(f"Error saving prepared template: {e}")
+        return None
+
+if __name__ == "__main__":
+    # Re-run this whenever vendor_questionnaire_template.csv changes; Phase 1 falls back to the CSV
+    # if the prepared pickle is missing or older than the CSV
+    prepared_file = prepare_template()
+    if prepared_file:
+        print("\nTemplate prepared.")
+    else:
+        print("Could not prepare template. Exiting.")